@@ -2,7 +2,7 @@
 
 import os
 import logging
-from typing import List, Tuple, Iterable
+from typing import FrozenSet, List, Optional, Tuple, Iterable
 
 from .util import Host, PersistentState
 from .exceptions import InvalidUsage
@@ -34,6 +34,7 @@ class Blocklist:
 
         self._known_hosts = set()
         self._known_hosts_dict = {}
+        self._unique_hosts_dict = {}
         self.add_known_hosts(hosts)
 
         # Set the commands that can be executed via the endpoint
@@ -58,7 +59,15 @@ class Blocklist:
         success
             Did the update succeed.
         """
-        h, checks = self._check_hosts(hosts)
+        parsed = self._parse_hosts(hosts)
+
+        # Skip validation and persisting if all hosts are known and blocklisted
+        incoming = set(parsed)
+        if incoming <= self._known_hosts and incoming <= self._hosts:
+            logger.debug("Nothing to add.")
+            return True
+
+        h, checks = self._check_hosts(parsed)
 
         if not all(checks):
             bad_hosts = [host for host, check in zip(hosts, checks) if not check]
@@ -72,7 +81,8 @@ class Blocklist:
         hosts = set(h)
 
         already_blocklisted = hosts & self.hosts
-        if already_blocklisted:
+        # Avoid formatting the host list if it's not going to be logged
+        if already_blocklisted and logger.isEnabledFor(logging.DEBUG):
             logger.debug(
                 f"Hosts {Host.print_list(already_blocklisted)} are already blocklisted."
             )
@@ -82,13 +92,13 @@ class Blocklist:
             logger.debug("Nothing to add.")
             return True
 
-        new_hosts = [f"{host}" for host in self.hosts | hosts]
-
         logger.info(f"Adding {Host.print_list(hosts)} to blocklist.")
         with self._state.update():
-            logger.info(new_hosts)
-            self._state.state["blocklist_hosts"] = new_hosts
-        self._build_hosts()
+            self._state.state["blocklist_hosts"] += [f"{host}" for host in hosts]
+
+        # Only touch the cached set once the update has been committed
+        self._hosts.update(hosts)
+        self._hosts_frozen, self._hosts_str = self._hosts_views()
 
         return True
 
@@ -107,7 +117,15 @@ class Blocklist:
         success
             Did the update succeed.
         """
-        h, checks = self._check_hosts(hosts)
+        parsed = self._parse_hosts(hosts)
+
+        # Skip validation and persisting if all hosts are known and not blocklisted
+        incoming = set(parsed)
+        if incoming <= self._known_hosts and incoming.isdisjoint(self._hosts):
+            logger.debug("Nothing to remove.")
+            return True
+
+        h, checks = self._check_hosts(parsed)
 
         if not all(checks):
             bad_hosts = [host for host, check in zip(hosts, checks) if not check]
@@ -124,7 +142,8 @@ class Blocklist:
         hosts = set(h)
 
         not_blocklisted = hosts - self.hosts
-        if not_blocklisted:
+        # Avoid formatting the host list if it's not going to be logged
+        if not_blocklisted and logger.isEnabledFor(logging.DEBUG):
             logger.debug(
                 f"Hosts {Host.print_list(not_blocklisted)} are not in " "the blocklist."
             )
@@ -134,12 +153,15 @@ class Blocklist:
             logger.debug("Nothing to remove.")
             return True
 
-        new_hosts = [f"{host}" for host in set(self.hosts) - set(hosts)]
+        new_hosts = [f"{host}" for host in self._hosts if host not in hosts]
 
         logger.info(f"Removing {Host.print_list(hosts)} from blocklist.")
         with self._state.update():
             self._state.state["blocklist_hosts"] = new_hosts
-        self._build_hosts()
+
+        # Only touch the cached set once the update has been committed
+        self._hosts.difference_update(hosts)
+        self._hosts_frozen, self._hosts_str = self._hosts_views()
 
         return True
 
@@ -153,10 +175,35 @@ class Blocklist:
         """
         with self._state.update():
             self._state.state["blocklist_hosts"] = []
-        self._build_hosts()
+        self._hosts.clear()
+        self._hosts_frozen, self._hosts_str = self._hosts_views()
 
         return True
 
+    @staticmethod
+    def _parse_hosts(hosts: Optional[List[str]]) -> List[Host]:
+        """Turn a list of `host:port` strings into hosts.
+
+        Parameters
+        ----------
+        hosts
+            Hosts to parse. Entries that are already a `Host` are passed through.
+
+        Returns
+        -------
+        hosts
+            List of parsed hosts. Empty if `hosts` is `None`.
+        """
+        if not hosts:
+            return []
+
+        # Host lists are often pasted with duplicates, only parse each entry once
+        parsed = {}
+        for host in hosts:
+            if not isinstance(host, Host) and host not in parsed:
+                parsed[host] = Host(host)
+        return [host if isinstance(host, Host) else parsed[host] for host in hosts]
+
     def _check_hosts(self, hosts: List[Host]) -> Tuple[List[Host], List[bool]]:
         """Check hosts against list of known hosts.
 
@@ -181,58 +228,73 @@ class Blocklist:
             if not isinstance(host, Host):
                 host = Host(host)
 
-            valid = True
+            # A full host:port match is always valid
+            if host in self._known_hosts:
+                return host, True
 
-            # First check to see if any hosts match the hostname
+            # Next check to see if any hosts match the hostname
             if host.hostname not in self._known_hosts_dict:
                 logger.debug(f"No known host with matching hostname={host.hostname}")
-                valid = False
+                return host, False
 
-            # If no port was set, try and find a matching one...
-            elif host.port is None:
-                matching_hosts = self._known_hosts_dict[host.hostname]
-
-                if len(matching_hosts) > 1:
+            # If no port was set, substitute the matching one if it is unique...
+            if host.port is None:
+                try:
+                    return self._unique_hosts_dict[host.hostname], True
+                except KeyError:
                     logger.debug(
                         f"Cannot match hostname={host.hostname} to a unique "
-                        f"host:port combination ({len(matching_hosts)} possibilities)."
+                        f"host:port combination "
+                        f"({len(self._known_hosts_dict[host.hostname])} possibilities)."
                     )
-                    valid = False
-                elif len(matching_hosts) == 0:
-                    logger.debug(f"No host matching hostname={host.hostname} found")
-                    valid = False
-                host = list(matching_hosts)[0]
-            # Check if there are any matching host+port entries
-            elif host not in self._known_hosts_dict[host.hostname]:
-                logger.debug(
-                    f"Hosts found with matching hostname={host.hostname}, "
-                    "but none have port={host.port}"
-                )
-                valid = False
-
-            return host, valid
+                    return host, False
+
+            logger.debug(
+                f"Hosts found with matching hostname={host.hostname}, "
+                f"but none have port={host.port}"
+            )
+            return host, False
 
         # Check and substitute the host list
         if not hosts:
             return [], [True]
-        return zip(*[_check_host(host) for host in hosts])
+
+        checked_hosts, checks = [], []
+        for host in hosts:
+            checked_host, valid = _check_host(host)
+            checked_hosts.append(checked_host)
+            checks.append(valid)
+        return checked_hosts, checks
 
     def _build_hosts(self):
-        """Cache the list of hosts from the state."""
+        """Cache the list of hosts from the state.
+
+        This parses every persisted entry, so it is only done on load. Updates
+        modify the cached set incrementally.
+        """
         self._hosts = set(
             Host(hoststr) for hoststr in self._state.state["blocklist_hosts"]
         )
+        self._hosts_frozen, self._hosts_str = self._hosts_views()
+
+    def _hosts_views(self) -> Tuple[FrozenSet[Host], Tuple[str, ...]]:
+        """Build the views of the hosts handed out by `hosts` and a GET.
+
+        They are cached whenever the hosts change.
+        """
+        # The set is modified in place, so callers get an immutable snapshot of it
+        return frozenset(self._hosts), tuple(f"{host}" for host in self._hosts)
 
     @property
-    def hosts(self) -> List[Host]:
+    def hosts(self) -> FrozenSet[Host]:
         """Get the blocklisted hosts.
 
         Returns
         -------
         hosts
-            List of blocklisted hosts.
+            Snapshot of the blocklisted hosts.
         """
-        return self._hosts
+        return self._hosts_frozen
 
     def add_known_hosts(self, hosts: Iterable[Host]):
         """Add to the set of known hosts.
@@ -248,11 +310,19 @@ class Blocklist:
         for host in hosts:
             self._known_hosts_dict.setdefault(host.hostname, set()).add(host)
 
+        # ...and one for the hostnames that resolve to a single host
+        for hostname in {host.hostname for host in hosts}:
+            matching_hosts = self._known_hosts_dict[hostname]
+            if len(matching_hosts) == 1:
+                self._unique_hosts_dict[hostname] = next(iter(matching_hosts))
+            else:
+                self._unique_hosts_dict.pop(hostname, None)
+
     async def process_get(self, _):
         """Process the GET request."""
         return Result(
             "blocklist",
-            result={Host("coco"): ([f"{host}" for host in self.hosts], 200)},
+            result={Host("coco"): (list(self._hosts_str), 200)},
             type_="FULL",
         )
 
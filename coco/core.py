@@ -6,6 +6,7 @@ Also loads the config.
 """
 import asyncio
 import datetime
+import itertools
 import logging
 import time
 import os
@@ -99,6 +100,9 @@ class Core:
         self._load_endpoints()
         self._local_endpoints()
         self._check_endpoint_links()
+
+        # Endpoint names are sent to redis with every request, so encode them once
+        self._endpoint_bytes = {name: name.encode() for name in self.endpoints}
         self._register_config()
 
         try:
@@ -122,7 +126,7 @@ class Core:
             """ if redis.call('llen', KEYS[1]) >= tonumber(ARGV[1]) then
                         return true
                     else
-                        redis.call('hmset', KEYS[2], ARGV[2], ARGV[3], ARGV[4], ARGV[5], ARGV[6], ARGV[7], ARGV[8], ARGV[9], ARGV[10], ARGV[11])
+                        redis.call('hmset', KEYS[2], 'method', ARGV[2], 'endpoint', ARGV[3], 'request', ARGV[4], 'params', ARGV[5], 'received', ARGV[6])
                         redis.call('rpush', KEYS[1], KEYS[2])
                         return false
                     end
@@ -147,6 +151,7 @@ class Core:
         except Exception:
             self.qworker.join()
 
+        self._init_task_names()
         self._call_endpoints_on_start()
         self._start_server()
 
@@ -174,15 +179,33 @@ class Core:
             if self.qworker:
                 self.qworker.kill()
 
+    def _init_task_names(self):
+        """Set up task names for the current process, unless it already has them."""
+        pid = os.getpid()
+        if getattr(self, "_task_pid", None) == pid:
+            return
+        self._task_pid = pid
+        # Redis outlives coco and may still hold tasks of an earlier process with the
+        # same ID, so the start time is part of the names
+        self._task_prefix = f"{pid}-{time.time()}-"
+        self._task_counter = itertools.count()
+
+    def _task_name(self):
+        """Create a unique name for a task: <process ID>-<start time>-<counter>."""
+        return f"{self._task_prefix}{next(self._task_counter)}"
+
     def _call_endpoints_on_start(self):
+        # Initialise all request counters and queue the calls of all endpoints that
+        # should be called on start in a single round-trip
+        pipe = self.redis_sync.pipeline(transaction=False)
+        tasks = []
         for endpoint in self.endpoints.values():
-            # Initialise request counter
-            self.redis_sync.incr(f"dropped_counter_{endpoint.name}", amount=0)
+            pipe.incr(f"dropped_counter_{endpoint.name}", amount=0)
             if endpoint.call_on_start:
                 logger.debug(f"Calling endpoint on start: /{endpoint.name}")
-                name = f"{os.getpid()}-{time.time()}"
+                name = self._task_name()
 
-                self.redis_sync.hmset(
+                pipe.hmset(
                     name,
                     {
                         "method": endpoint.type,
@@ -190,15 +213,19 @@ class Core:
                         "request": json.dumps({}),
                     },
                 )
-
-                # Add task name to queue
-                self.redis_sync.rpush("queue", name)
-
-                # Wait for the result
-                result = self.redis_sync.blpop(f"{name}:res")[1]
-                self.redis_sync.delete(f"{name}:res")
-                # TODO: raise log level in failure case?
-                logger.debug(f"Called /{endpoint.name} on start, result: {result}")
+                pipe.rpush("queue", name)
+                tasks.append((endpoint, name))
+        pipe.execute()
+
+        # Then wait for the replies. The worker runs the queue in order, so they
+        # arrive in the order the tasks were queued in.
+        for endpoint, name in tasks:
+            # The result is pushed right after the status code. Popping both leaves
+            # the list empty, so redis removes the key by itself.
+            self.redis_sync.blpop(f"{name}:reply")
+            result = self.redis_sync.lpop(f"{name}:reply")
+            # TODO: raise log level in failure case?
+            logger.debug(f"Called /{endpoint.name} on start, result: {result}")
 
     def _start_server(self):
         """Start a sanic server."""
@@ -218,6 +245,11 @@ class Core:
             self.redis_async.close()
             await self.redis_async.wait_closed()
 
+        # Sanic may run the server in several processes, they need their own task names
+        def init_task_names(*_):
+            self._init_task_names()
+
+        self.sanic_app.register_listener(init_task_names, "before_server_start")
         self.sanic_app.register_listener(init_redis_async, "before_server_start")
         self.sanic_app.register_listener(close_redis_async, "after_server_stop")
 
@@ -325,9 +357,10 @@ class Core:
             )
 
         # Read groups
-        self.groups = self.config["groups"].copy()
-        for group, hosts in self.groups.items():
-            self.groups[group] = [Host(h) for h in hosts]
+        self.groups = {
+            group: [Host(h) for h in hosts]
+            for group, hosts in self.config["groups"].items()
+        }
 
         # Init state, tries loading from persistent storage
         self.state = State(
@@ -386,6 +419,8 @@ class Core:
             self.forwarder.add_endpoint(name, self.endpoints[name])
 
     def _check_endpoint_links(self):
+        valid_names = set(self.endpoints)
+
         def check(e):
             if e:
                 for a in e:
@@ -400,7 +435,7 @@ class Core:
                         a = list(a.keys())[0]
                     if isinstance(a, CocoForward):
                         a = a.name
-                    if a not in self.endpoints.keys():
+                    if a not in valid_names:
                         raise ConfigError(
                             f"coco.endpoint: endpoint `{a}` found in config for "
                             f"`{e.name}` does not exist."
@@ -420,9 +455,11 @@ class Core:
 
         Core endpoint. Passes all endpoint calls on to redis and blocks until completion.
         """
-        # create a unique name for this task: <process ID>-<POSIX timestamp>
+        name = self._task_name()
         now = time.time()
-        name = f"{os.getpid()}-{now}"
+
+        # Unknown endpoints are passed on as they are, the worker will reject them
+        endpoint_name = self._endpoint_bytes.get(endpoint, endpoint)
 
         with await self.redis_async as r:
             # Check if queue is full. If not, add this task.
@@ -432,15 +469,10 @@ class Core:
                     keys=["queue", name],
                     args=[
                         self.config["queue_length"],
-                        "method",
                         request.method,
-                        "endpoint",
-                        endpoint,
-                        "request",
+                        endpoint_name,
                         request.body,
-                        "params",
                         request.query_string,
-                        "received",
                         now,
                     ],
                 )
@@ -452,30 +484,30 @@ class Core:
                         {"reply": "Coco queue is full.", "status": 503}, status=503
                     )
             else:
-                # No limit on queue, just give the task to redis
-                await r.hmset(
+                # No limit on queue, just give the task to redis and add the task
+                # name to the queue in a single round-trip
+                pipe = r.pipeline()
+                pipe.hmset(
                     name,
-                    "method",
+                    b"method",
                     request.method,
-                    "endpoint",
-                    endpoint,
-                    "request",
+                    b"endpoint",
+                    endpoint_name,
+                    b"request",
                     request.body,
-                    "params",
+                    b"params",
                     request.query_string,
-                    "received",
+                    b"received",
                     now,
                 )
-
-                # Add task name to queue
-                await r.rpush("queue", name)
-
-            # Wait for the result (operations must be in this order to ensure
-            # the result is available)
-            code = int((await r.blpop(f"{name}:code"))[1])
-            result = (await r.blpop(f"{name}:res"))[1]
-            await r.delete(f"{name}:res")
-            await r.delete(f"{name}:code")
+                pipe.rpush("queue", name)
+                await pipe.execute()
+
+            # Wait for the reply. The worker pushes the status code and the result
+            # in a single command, so the result is there once the code is.
+            # Popping both leaves the list empty, so redis removes the key by itself.
+            code = int((await r.blpop(f"{name}:reply"))[1])
+            result = await r.lpop(f"{name}:reply")
 
         return response.raw(
             result, status=code, headers={"Content-Type": "application/json"}
@@ -435,26 +435,28 @@ class Endpoint:
         if request is None:
             request = dict()
         if filtered_request:
-            for key, value in filtered_request.items():
-                try:
-                    if not isinstance(request[key], value):
-                        msg = (
-                            f"{self.name} received value '{key}'' of type "
-                            f"{type(request[key]).__name__} (expected {value.__name__})."
-                        )
+            # Persist the state changes for all values at once
+            with self.state.batch():
+                for key, value in filtered_request.items():
+                    try:
+                        if not isinstance(request[key], value):
+                            msg = (
+                                f"{self.name} received value '{key}'' of type "
+                                f"{type(request[key]).__name__} (expected {value.__name__})."
+                            )
+                            self.logger.warning(msg)
+                            raise InvalidUsage(msg)
+                    except KeyError as e:
+                        msg = f"{self.name} requires value '{key}'."
                         self.logger.warning(msg)
-                        raise InvalidUsage(msg)
-                except KeyError as e:
-                    msg = f"{self.name} requires value '{key}'."
-                    self.logger.warning(msg)
-                    raise InvalidUsage(msg) from e
+                        raise InvalidUsage(msg) from e
 
-                # save the state change:
-                if self.save_state:
-                    for path in self.save_state:
-                        self.state.write(path, request.get(key), key)
+                    # save the state change:
+                    if self.save_state:
+                        for path in self.save_state:
+                            self.state.write(path, request.get(key), key)
 
-                filtered_request[key] = request.pop(key)
+                    filtered_request[key] = request.pop(key)
 
         # log the request content
         msg = ""
@@ -508,10 +510,12 @@ class Endpoint:
             result.state(self.state.extract(self.get_state))
 
         if result.success:
-            if self.set_state:
-                for path, value in self.set_state.items():
-                    self.state.write(path, value)
-            self.write_timestamp()
+            # Persist the state changes and the timestamp at once
+            with self.state.batch():
+                if self.set_state:
+                    for path, value in self.set_state.items():
+                        self.state.write(path, value)
+                self.write_timestamp()
             self.logger.debug("Success!")
 
         return result
@@ -421,13 +421,16 @@ class RequestForwarder:
         if timeout is None:
             timeout = self.timeout
 
+        # Most of the time the blocklist is empty, skip hashing every host then
+        blocked = self.blocklist.hosts
+
         connector = aiohttp.TCPConnector(limit=0)
         async with aiohttp.ClientSession(
             connector=connector,
             trace_configs=([_trace_config()] if self._debug_connections else None),
         ) as session, TaskPool(self.session_limit) as tasks:
             for host in hosts:
-                if host not in self.blocklist.hosts:
+                if not blocked or host not in blocked:
                     await tasks.put(
                         self._request(
                             session, method, host, name, request, params, timeout
@@ -1,9 +1,14 @@
 """coco state module."""
 
+from collections import OrderedDict
+import copy
+import functools
 import logging
+import operator
 import os
 from pathlib import Path
-from typing import List, Dict
+import sys
+from typing import List, Dict, Tuple
 import yaml
 
 from .result import Result
@@ -19,8 +24,73 @@ def my_construct_mapping(self, node, deep=False):
     return {(str(key) if isinstance(key, int) else key): data[key] for key in data}
 
 
+# Use the much faster libyaml based loader if available
+try:
+    _YamlLoader = yaml.CSafeLoader
+except AttributeError:
+    _YamlLoader = yaml.SafeLoader
+
+# The patch is applied to the loader classes, so patch both of them
 yaml.SafeLoader.construct_mapping_org = yaml.SafeLoader.construct_mapping
 yaml.SafeLoader.construct_mapping = my_construct_mapping
+if _YamlLoader is not yaml.SafeLoader:
+    _YamlLoader.construct_mapping_org = _YamlLoader.construct_mapping
+    _YamlLoader.construct_mapping = my_construct_mapping
+
+# Parsed YAML files by file name, as (modification time, size, inode, content)
+_YAML_CACHE = OrderedDict()
+_YAML_CACHE_SIZE = 100
+
+
+def _load_yaml_cached(file):
+    """
+    Load a YAML file, skipping the parsing if the file didn't change since last time.
+
+    Files are considered unchanged if their modification time, size and inode are the same.
+    Only meant for the default state files, which are loaded again on every reset.
+
+    Parameters
+    ----------
+    file : str
+        Name of the file to read from.
+
+    Returns
+    -------
+    The content of the file. This is a copy, so it can be modified freely.
+    """
+    stat = os.stat(file)
+    cached = _YAML_CACHE.get(file)
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    if cached is None or cached[:3] != key:
+        with open(file, "r") as stream:
+            content = yaml.load(stream, Loader=_YamlLoader)
+        cached = (*key, content)
+        _YAML_CACHE[file] = cached
+        if len(_YAML_CACHE) > _YAML_CACHE_SIZE:
+            _YAML_CACHE.popitem(last=False)
+    _YAML_CACHE.move_to_end(file)
+    return copy.deepcopy(cached[3])
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_path(path: str) -> Tuple[str, ...]:
+    """
+    Split a state path at slashes and throw away empty parts.
+
+    Endpoints keep using the same few paths, so the parsed paths are cached. The parts are
+    interned, so lookups of keys that are interned as well only compare pointers.
+
+    Parameters
+    ----------
+    path : str
+        `"path/to/the/entry"`
+
+    Returns
+    -------
+    Tuple[str]
+        The parts of the path.
+    """
+    return tuple(sys.intern(part) for part in path.split("/") if part)
 
 
 class State:
@@ -47,11 +117,17 @@ class State:
         exclude_from_reset : List[str]
             State paths that should be preserved during reset.
         """
+        # Set the level first, so logging during construction already uses it
+        logger.setLevel(log_level)
+
         self.default_state_files = default_state_files
         self.exclude_from_reset = exclude_from_reset
         self._storage_path = storage_path
         self._name_active_state = "active"
 
+        # Cached hashes of parts of the state, cleared whenever the state changes
+        self._hash_cache = {}
+
         # List saved states on disk
         p = Path(self._storage_path).glob("**/*")
         self._saved_states = [f.name for f in p if f.is_file()]
@@ -73,7 +149,19 @@ class State:
             logger.info("Internal state empty. Loading state from file...")
             self._load_default_state()
 
-        logger.setLevel(log_level)
+    def batch(self):
+        """
+        Group several updates of the state into a single write to disk.
+
+        Any writes done inside the returned context manager are persisted when it
+        exits. Don't modify or keep values read from the state in there, they are not
+        copies.
+
+        Returns
+        -------
+        context manager
+        """
+        return self._storage.update()
 
     def write(self, path, value, name=None):
         """
@@ -89,6 +177,8 @@ class State:
         name : str
             The name of the entry. If this is `None` the last part of `path` will be used.
         """
+        self._hash_cache.clear()
+
         # Update persistent state
         with self._storage.update():
             if name is None:
@@ -96,7 +186,7 @@ class State:
             else:
                 element = self._find(path)
 
-            element[name] = value
+            element[name] = copy.deepcopy(value)
 
     def read(self, path, name=None):
         """
@@ -136,36 +226,12 @@ class State:
         """
         value = self.read(path)
 
-        # parse the path: split it at slashes and throw away empty parts
-        parts = path.split("/")
-        parts = list(filter(lambda part: part != "", parts))
-
-        def pack(p: List[str], v) -> dict:
-            """
-            Pack a value into a nested dict.
-
-            Parameters
-            ----------
-            p : list
-                Path for nested dict.
-            v
-                Value.
-
-            Returns
-            -------
-            dict
-                A nested dict containing the full given path and only the one given value at the
-                bottom.
-            """
-            if len(p) == 0:
-                return v
-            if len(p) == 1:
-                return dict({p[0]: value})
-            return dict({p[0]: pack(p[1:], v)})
-
-        return pack(parts, value)
-
-    def read_from_file(self, path, file):
+        # wrap the value into a nested dict, starting with the innermost level
+        for part in reversed(_parse_path(path)):
+            value = {part: value}
+        return value
+
+    def read_from_file(self, path, file, cache=False):
         """
         Write into the state from what is read from a file.
 
@@ -175,27 +241,34 @@ class State:
             `"path/to/the/new/state/entry"`
         file : str
             Name of the file to read from.
+        cache : bool
+            Keep the parsed file in memory and only parse it again if it changed.
         """
-        logger.debug(f"Loading file {file} into state path '{path}'.")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Loading file {file} into state path '{path}'.")
+        self._hash_cache.clear()
 
         # Update persistent state
         with self._storage.update():
             if len(path) != 0:
                 element, name = self._find_new(path)
 
-            with open(file, "r") as stream:
-                try:
-                    new_state = yaml.safe_load(stream)
-
-                    # Don't load state parts that are excluded from reset
-                    self._exclude_paths(path, new_state)
-
-                    if len(path) == 0:
-                        self._storage.state = new_state
-                    else:
-                        element[name] = new_state
-                except yaml.YAMLError as exc:
-                    logger.error(f"Failure reading YAML file {file}: {exc}")
+            try:
+                if cache:
+                    new_state = _load_yaml_cached(file)
+                else:
+                    with open(file, "r") as stream:
+                        new_state = yaml.load(stream, Loader=_YamlLoader)
+
+                # Don't load state parts that are excluded from reset
+                self._exclude_paths(path, new_state)
+
+                if len(path) == 0:
+                    self._storage.state = new_state
+                else:
+                    element[name] = new_state
+            except yaml.YAMLError as exc:
+                logger.error(f"Failure reading YAML file {file}: {exc}")
 
     def _exclude_paths(self, path, state):
         """
@@ -262,18 +335,13 @@ class State:
         InternalError
             If the path doesn't exist.
         """
-        if path is None or path == "" or path == "/":
-            return self._storage.state
-        paths = path.split("/")
         element = self._storage.state
-        for p in paths:
-            if p == "":
-                continue
-            try:
-                element = element[p]
-            except KeyError as e:
-                raise InternalError(f"Path not found in state: {path}") from e
-        return element
+        if not path:
+            return element
+        try:
+            return functools.reduce(operator.getitem, _parse_path(path), element)
+        except KeyError as e:
+            raise InternalError(f"Path not found in state: {path}") from e
 
     def _find_new(self, path):
         """
@@ -289,17 +357,17 @@ class State:
             The parent entry and the name of the new entry (can be used like
             `parent_entry[name] = <new_value>`).
         """
-        if path is None or path == "" or path == "/":
+        parts = _parse_path(path) if path else ()
+        if not parts:
             raise RuntimeError("Can't create new state entry at root level.")
-        paths = path.split("/")
         element = self._storage.state
-        for i in range(0, len(paths) - 1):
+        for part in parts[:-1]:
             try:
-                element = element[paths[i]]
+                element = element[part]
             except KeyError:
-                element[paths[i]] = dict()
-                element = element[paths[i]]
-        return element, paths[-1]
+                element[part] = dict()
+                element = element[part]
+        return element, parts[-1]
 
     def find_or_create(self, path):
         """
@@ -317,14 +385,20 @@ class State:
         """
         if path is None:
             return None
-        if path is None or path == "" or path == "/":
+        parts = _parse_path(path)
+        if not parts:
             return self._storage.state
-        paths = path.split("/")
+
+        # Most paths exist already, don't write the state to disk for those
+        try:
+            return functools.reduce(operator.getitem, parts, self._storage.state)
+        except (KeyError, TypeError):
+            pass
 
         # Update persistent state
         with self._storage.update():
             element = self._storage.state
-            for i, p in enumerate(paths):
+            for i, p in enumerate(parts):
                 try:
                     element = element[p]
                 except TypeError as e:
@@ -334,9 +408,10 @@ class State:
                         f"state block."
                     ) from e
                 except KeyError:
+                    self._hash_cache.clear()
                     element[p] = dict()
                     element = element[p]
-        return element
+        return copy.deepcopy(element)
 
     def hash(self, path=None):
         """
@@ -351,8 +426,13 @@ class State:
         -------
             The hash for the selected part of the state.
         """
-        element = self._find(path)
-        return hash_dict(element)
+        try:
+            return self._hash_cache[path]
+        except KeyError:
+            pass
+        hash_ = hash_dict(self._find(path))
+        self._hash_cache[path] = hash_
+        return hash_
 
     def is_empty(self):
         """
@@ -367,8 +447,10 @@ class State:
 
     def _load_default_state(self):
         """Load internal state from yaml files."""
-        for path, file in self.default_state_files.items():
-            self.read_from_file(path, file)
+        # Persist all files at once
+        with self._storage.update():
+            for path, file in self.default_state_files.items():
+                self.read_from_file(path, file, cache=True)
 
     def saved_state_exists(self, name: str):
         """Check if a saved state with a given name exists."""
@@ -382,12 +464,13 @@ class State:
         """
         excluded = self._backup_excluded_paths()
 
-        # Reset persistent state
+        # Reset persistent state, writing it to disk only once
+        self._hash_cache.clear()
         with self._storage.update():
             self._storage.state = dict()
-        self._load_default_state()
+            self._load_default_state()
 
-        self._recover_excluded_paths(excluded)
+            self._recover_excluded_paths(excluded)
 
     async def save_state(self, request: dict = None):
         """
@@ -455,6 +538,7 @@ class State:
         excluded = self._backup_excluded_paths()
 
         # Reset persistent state
+        self._hash_cache.clear()
         with self._storage.update():
             self._storage.state = dict()
         self.read_from_file("", str(Path(self._storage_path, name)))
@@ -495,7 +579,8 @@ class State:
         return excluded
 
     def _recover_excluded_paths(self, paths):
-        for path, content in paths.items():
-            with self._storage.update():
+        self._hash_cache.clear()
+        with self._storage.update():
+            for path, content in paths.items():
                 location, new_entry = self._find_new(path)
                 location[new_entry] = content
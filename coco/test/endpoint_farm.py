@@ -3,9 +3,13 @@ Endpoint farm for testing coco.
 
 Simulates multiple hosts with endpoints.
 """
+import collections
+import logging
 import os
 import socket
-from contextlib import closing
+import threading
+import time
+from contextlib import closing, ExitStack
 from multiprocessing import Manager, Process
 
 from flask import Flask, request, jsonify
@@ -18,11 +22,11 @@ app = Flask(__name__)
 @app.route("/<name>")
 def endpoint(name):
     """Accept any endpoint call."""
-    # Increment or create a counter
-    try:
-        app.counter[name] += 1
-    except KeyError:
-        app.counter[name] = 1
+    # Requests are handled in threads. Count locally and only send the new value to
+    # the shared counter, so each call is a single round-trip to the manager.
+    with app.counter_lock:
+        app.local_counter[name] += 1
+        app.counter[name] = app.local_counter[name]
 
     try:
         reply = dict(request.json)
@@ -39,19 +43,46 @@ def endpoint(name):
     return jsonify(reply)
 
 
-def find_free_port():
-    """Return an unused port."""
-    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
-        s.bind(("", 0))
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        return s.getsockname()[1]
+def find_free_ports(n):
+    """Return `n` distinct unused ports."""
+    # Keep all sockets open until every port is found, so none is returned twice
+    with ExitStack() as stack:
+        ports = []
+        for _ in range(n):
+            s = stack.enter_context(
+                closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM))
+            )
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            s.bind(("", 0))
+            ports.append(s.getsockname()[1])
+        return ports
+
+
+def wait_for_port(port, timeout=10):
+    """Wait until a server accepts connections on `port`."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection(("localhost", port), timeout=1):
+                return
+        except OSError as err:
+            if time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"Test endpoints on port {port} did not start."
+                ) from err
+            time.sleep(0.05)
 
 
 def flask_start(port, counter, callbacks):
     """Run a flask web server."""
     app.counter = counter
+    app.local_counter = collections.Counter()
+    app.counter_lock = threading.Lock()
     app.callbacks = callbacks
-    app.run(port=port, debug=True, use_reloader=False)
+
+    # Don't log every single request
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    app.run(port=port, debug=False, use_reloader=False, threaded=True)
 
 
 class Farm:
@@ -79,8 +110,7 @@ class Farm:
         # Tell flask that this is not a prod environment
         os.environ["FLASK_ENV"] = "development"
 
-        for i in range(ports):
-            port = find_free_port()
+        for port in find_free_ports(ports):
             counter = self._manager.dict()
 
             print("Started new process for test endpoints on port {}.".format(port))
@@ -92,14 +122,21 @@ class Farm:
             self._counters[port] = counter
             self._processes.append(p)
 
+        # Don't hand out the farm before all servers are up
+        for port in self.ports:
+            wait_for_port(port)
+
     def __del__(self):
         """
         Destructor.
 
         Stop the farm.
         """
+        # Signal all servers first, so they shut down at the same time
         for p in self._processes:
             p.terminate()
+        for p in self._processes:
+            p.join(timeout=5)
         self._manager.shutdown()
 
     def counters(self):
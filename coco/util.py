@@ -4,7 +4,6 @@ Utility functions.
 The str2time* functions were stolen from dias
 (https://github.com/chime-experiment/dias/blob/master/dias/utils/string_converter.py).
 """
-import collections
 import copy
 from datetime import timedelta
 import hashlib
@@ -88,6 +87,10 @@ class Host:
         self.hostname = self._url.hostname
         self.port = self._url.port
 
+        # Hosts get formatted a lot (e.g. for logs and replies), do it only once
+        self._str = f"{self.hostname}:{self.port}"
+        self._formatted = self.hostname if self.port is None else self._str
+
     def join_endpoint(self, endpoint: str):
         """Get a URL for the given endpoint."""
         return self._url._replace(path=endpoint).geturl()
@@ -103,12 +106,10 @@ class Host:
         return hash((self.hostname, self.port))
 
     def __str__(self):
-        return f"{self.hostname}:{self.port}"
+        return self._str
 
     def __format__(self, format_spec):
-        if self.port is None:
-            return self.hostname
-        return f"{self.hostname}:{self.port}"
+        return self._formatted
 
     @staticmethod
     def format_host(host: str) -> str:
@@ -133,7 +134,7 @@ class Host:
     @staticmethod
     def print_list(hosts) -> str:
         """Print a list of hosts."""
-        return "[" + (", ".join([f"{host}" for host in hosts])) + "]"
+        return "[" + ", ".join(map(format, hosts)) + "]"
 
 
 class PersistentState:
@@ -148,6 +149,8 @@ class PersistentState:
     def __init__(self, path: os.PathLike):
         self._path = path
         self._update = False
+        self._update_depth = 0
+        self._touched = False
 
         if path.exists():
             with path.open("r") as fh:
@@ -159,6 +162,10 @@ class PersistentState:
     def state(self):
         """Get the state."""
         if self._update:
+            # Only copy the state once it is actually used by the update
+            if not self._touched:
+                self._tmp_state = copy.deepcopy(self._state)
+                self._touched = True
             return self._tmp_state
         return copy.deepcopy(self._state)
 
@@ -166,7 +173,8 @@ class PersistentState:
     def state(self, value):
         """Set the state if in update mode."""
         if self._update:
-            self._tmp_state = value
+            self._tmp_state = copy.deepcopy(value)
+            self._touched = True
         else:
             raise RuntimeError("Cannot update state outside of a `.update() context.")
 
@@ -175,16 +183,30 @@ class PersistentState:
         if not self._update:
             raise RuntimeError("Must be in update mode to call commit.")
 
+        # Nothing to do if the update never used the state
+        if not self._touched:
+            return
+
         # Take a reference to the old state in case of failure and we need to revert
         old_state = self._state
 
         # Lock to ensure the state can only be read for states that were
         # successfully committed
         try:
-            # Try to update and write out the state
-            self._state = copy.deepcopy(self._tmp_state)
+            # Serialise in one go so the file gets a single write instead of
+            # one per encoded chunk
+            serialised = json.dumps(self._tmp_state, indent=4)
+
+            # atomic_write writes to a temporary file, fsyncs it, renames it
+            # over the old file and then fsyncs the parent directory, so a
+            # crash leaves either the old or the new state on disk
             with atomic_write(self._path, overwrite=True) as f:
-                json.dump(self._state, f, indent=4)
+                f.write(serialised)
+
+            # The temporary state was copied when the update first used it and is
+            # dropped here, so it can become the new state without another copy
+            self._state = self._tmp_state
+            self._tmp_state = None
 
         except Exception as e:
             # If anything happens, rollback to the old state
@@ -194,6 +216,10 @@ class PersistentState:
     def update(self):
         """Return a Context Manager that can atomically update the state.
 
+        Updates can be nested. Only the outermost one commits the state, so
+        several modifications can be grouped into a single write. An update that
+        never accesses the state doesn't write anything.
+
         Returns
         -------
         updater : context manager
@@ -214,10 +240,15 @@ class PersistentState:
             self._ps = ps
 
         def __enter__(self):
-            self._ps._tmp_state = self._ps.state
-            self._ps._update = True
+            if self._ps._update_depth == 0:
+                self._ps._touched = False
+                self._ps._update = True
+            self._ps._update_depth += 1
 
         def __exit__(self, *args):
+            self._ps._update_depth -= 1
+            if self._ps._update_depth > 0:
+                return
             try:
                 self._ps.commit()
             finally:
@@ -238,10 +269,19 @@ def hash_dict(dict_: Dict):
     -------
     Hash
     """
+    # This has to match the hash kotekan computes for its config, so stick with
+    # msgpack of the sorted dict and MD5
     serialized = msgpack.packb(sort_dict(dict_), use_bin_type=True)
-    _md5 = hashlib.md5()
-    _md5.update(serialized)
-    return _md5.hexdigest()
+    return hashlib.md5(serialized).hexdigest()
+
+
+def _sort_value(value):
+    """Recursively sort any dictionaries in a value."""
+    if isinstance(value, dict):
+        return sort_dict(value)
+    if isinstance(value, list):
+        return sort_list(value)
+    return value
 
 
 def sort_dict(dict_: Dict):
@@ -255,18 +295,12 @@ def sort_dict(dict_: Dict):
 
     Returns
     -------
-    collections.OrderedDict
+    dict
         The ordered dictionary.
     """
     if not isinstance(dict_, dict):
         return dict_
-    ordered = collections.OrderedDict(sorted(dict_.items(), key=lambda t: t[0]))
-    for key in ordered.keys():
-        if isinstance(ordered[key], dict):
-            ordered[key] = sort_dict(ordered[key])
-        elif isinstance(ordered[key], list):
-            ordered[key] = sort_list(ordered[key])
-    return ordered
+    return {key: _sort_value(dict_[key]) for key in sorted(dict_)}
 
 
 def sort_list(list_: Dict):
@@ -285,10 +319,4 @@ def sort_list(list_: Dict):
         lists it contains at any depths are sorted. Note that the list and any
         contained lists are not sorted themselves.
     """
-    list_copy = copy.copy(list_)
-    for i, item in enumerate(list_copy):
-        if isinstance(item, dict):
-            list_copy[i] = sort_dict(item)
-        elif isinstance(item, list):
-            list_copy[i] = sort_list(item)
-    return list_copy
+    return [_sort_value(item) for item in list_]
@@ -17,13 +17,12 @@ async def process_post(request: dict):
         The duration string represents a timedelta in the form `<int>h`, `<int>m`,
         `<int>s` or a combination of the three.
     """
-    if "duration" not in request:
+    raw = request.get("duration")
+    if raw is None:
         raise InvalidUsage("Value 'duration' not found in request.")
     try:
-        duration = str2total_seconds(request["duration"])
-    except Exception:
-        raise InvalidUsage(
-            f"Failed parsing value 'duration' ({duration})."
-        ) from Exception
+        duration = str2total_seconds(raw)
+    except (TypeError, ValueError, OverflowError) as err:
+        raise InvalidUsage(f"Failed parsing value 'duration' ({raw}).") from err
 
     await asyncio.sleep(duration)
@@ -168,9 +168,13 @@ def main_loop(
 
             # Always attempt to return the result so that the client doesn't hang...
             finally:
+                # Push the status code and the result in one go, so the client can
+                # fetch both as soon as the first one is available
+                reply = (code, json.dumps(result))
+
                 # If processing this request took a long time, the redis server may have hung up..
                 try:
-                    await conn.execute("rpush", f"{name}:res", json.dumps(result))
+                    await conn.execute("rpush", f"{name}:reply", *reply)
                 except aioredis.errors.ConnectionClosedError as err:
                     logger.debug(err)
                     logger.info(
@@ -179,9 +183,7 @@ def main_loop(
 
                     # open new connection and try one more time
                     conn = await _open_redis_connection()
-                    await conn.execute("rpush", f"{name}:res", json.dumps(result))
-                finally:
-                    await conn.execute("rpush", f"{name}:code", code)
+                    await conn.execute("rpush", f"{name}:reply", *reply)
 
         # optionally close connection
         conn.close()
@@ -1,4 +1,5 @@
 """Test the blocklist, in case you didn't get that from the filename."""
+import asyncio
 import logging
 
 import pytest
@@ -75,6 +76,11 @@ def test_remove(blocklist):
         blocklist.remove_hosts(["fakehost:1234"])
     assert blocklist.hosts == current_hosts
 
+    # The hosts handed out don't change with the blocklist
+    assert blocklist.remove_hosts(["testhost1:1234"])
+    assert Host("testhost1:1234") in current_hosts
+    assert len(blocklist.hosts) == 0
+
 
 def test_clear(blocklist):
     """."""
@@ -84,3 +90,31 @@ def test_clear(blocklist):
 
     assert blocklist.clear_hosts()
     assert len(blocklist.hosts) == 0
+
+
+def test_persist(blocklist, tmp_path):
+    """Check that a reloaded blocklist matches the one that was updated."""
+
+    assert blocklist.add_hosts(["testhost1:1234", "testhost2"])
+    assert blocklist.add_hosts(["testhost1:2345"])
+    assert blocklist.remove_hosts(["testhost1:1234"])
+
+    reloaded = Blocklist([], tmp_path / "blocklist.json")
+    assert reloaded.hosts == blocklist.hosts
+    assert reloaded.hosts == {Host("testhost1:2345"), Host("testhost2:1234")}
+
+
+def test_get(blocklist):
+    """Check the reports of the blocklist GET."""
+
+    assert blocklist.add_hosts(["testhost2"])
+
+    result = asyncio.run(blocklist.process_get(None))
+    assert result.report("FULL") == {
+        "success": True,
+        "blocklist": {"http://coco/": {"reply": ["testhost2:1234"], "status": 200}},
+    }
+    assert result.report("OVERVIEW") == {
+        "success": True,
+        "blocklist": {"['testhost2:1234']": 1},
+    }
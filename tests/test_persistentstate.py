@@ -47,3 +47,29 @@ def test_state(tmp_path):
     with p.open("r") as fh:
         disk_state = json.load(fh)
     assert disk_state == ps.state
+
+
+def test_nested_update(tmp_path):
+    """Test that nested updates are committed once by the outermost update."""
+
+    p = tmp_path / "state.json"
+    ps = PersistentState(p)
+
+    with ps.update():
+        ps.state = {"a": 1}
+        with ps.update():
+            ps.state["b"] = 2
+
+        # Nothing has been written yet
+        assert not p.exists()
+
+    assert ps.state == {"a": 1, "b": 2}
+    with p.open("r") as fh:
+        assert json.load(fh) == ps.state
+
+    # An update that doesn't touch the state doesn't write
+    mtime = p.stat().st_mtime_ns
+    with ps.update():
+        pass
+    assert p.stat().st_mtime_ns == mtime
+    assert ps.state == {"a": 1, "b": 2}
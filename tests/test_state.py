@@ -1,7 +1,9 @@
 from coco import state
 
+import asyncio
 from copy import deepcopy
 import tempfile
+from pathlib import Path
 
 
 def test_exclude():
@@ -34,3 +36,98 @@ def test_exclude():
     print("testing '' and {}".format(dict_))
     test_state._exclude_paths("", ex)
     assert ex == {"bar": {}, "fubar": 1}
+
+
+def test_hash_cache():
+    state_path = tempfile.TemporaryDirectory()
+    test_state = state.State(
+        "DEBUG", state_path.name, default_state_files={}, exclude_from_reset=[]
+    )
+
+    test_state.write("foo/bar", 1)
+    hash_foo = test_state.hash("foo")
+    hash_all = test_state.hash()
+    assert test_state.hash("foo") == hash_foo
+
+    # Changing the state has to change the hashes
+    test_state.write("foo/bar", 2)
+    assert test_state.hash("foo") != hash_foo
+    assert test_state.hash() != hash_all
+
+    test_state.write("foo/bar", 1)
+    assert test_state.hash("foo") == hash_foo
+    assert test_state.hash() == hash_all
+
+
+def test_reset_reloads_files(tmp_path):
+    state_path = tempfile.TemporaryDirectory()
+    state_file = tmp_path / "state.yaml"
+    state_file.write_text("foo: 1\n")
+    test_state = state.State(
+        "DEBUG",
+        state_path.name,
+        default_state_files={"bar": str(state_file)},
+        exclude_from_reset=[],
+    )
+    assert test_state.read("bar") == {"foo": 1}
+
+    # Changes to the state must not leak into the next reset
+    test_state.write("bar/foo", 2)
+    asyncio.run(test_state.reset_state())
+    assert test_state.read("bar") == {"foo": 1}
+
+    # ...but changes to the file have to be picked up
+    state_file.write_text("foo: 12\n")
+    asyncio.run(test_state.reset_state())
+    assert test_state.read("bar") == {"foo": 12}
+
+
+def test_write_copies_value():
+    state_path = tempfile.TemporaryDirectory()
+    test_state = state.State(
+        "DEBUG", state_path.name, default_state_files={}, exclude_from_reset=[]
+    )
+
+    value = {"bar": [1, 2]}
+    test_state.write("foo", value)
+    value["bar"].append(3)
+    assert test_state.read("foo") == {"bar": [1, 2]}
+
+    found = test_state.find_or_create("foo")
+    found["bar"].append(3)
+    assert test_state.read("foo") == {"bar": [1, 2]}
+
+
+def test_saved_states_not_cached():
+    state_path = tempfile.TemporaryDirectory()
+    test_state = state.State(
+        "DEBUG", state_path.name, default_state_files={}, exclude_from_reset=[]
+    )
+
+    test_state.write("foo", 1)
+    asyncio.run(test_state.save_state({"name": "saved"}))
+    test_state.write("foo", 2)
+    asyncio.run(test_state.load_state({"name": "saved"}))
+    assert test_state.read("foo") == 1
+
+    # Only the default state files are kept in memory
+    assert str(Path(state_path.name, "saved")) not in state._YAML_CACHE
+
+
+def test_empty_path_parts():
+    state_path = tempfile.TemporaryDirectory()
+    test_state = state.State(
+        "DEBUG", state_path.name, default_state_files={}, exclude_from_reset=[]
+    )
+
+    # Empty parts of a path are ignored, so a trailing slash names the entry itself
+    test_state.write("init/a", 1)
+    test_state.write("init/", {"b": 2})
+    assert test_state.read("") == {"init": {"b": 2}}
+
+    # ...and double slashes are the same as a single one
+    test_state.write("a//b", 3)
+    assert test_state.read("a") == {"b": 3}
+    assert test_state.read("/a/b/") == 3
+    assert test_state.find_or_create("c//d/") == {}
+    assert test_state.read("c") == {"d": {}}
@@ -1,7 +1,10 @@
 """Test the internal WAIT endpoint."""
+import asyncio
 import pytest
 import time
 
+from coco import wait
+from coco.exceptions import InvalidUsage
 from coco.test import coco_runner
 from coco.test import endpoint_farm
 
@@ -92,3 +95,10 @@ def test_timestamp(farm, runner):
     # This timestamps should be fresh. Test that it's between 0 and 10s old.
     assert time.time() - timestamp > 0
     assert time.time() - timestamp < 10
+
+
+def test_bad_duration():
+    """Test that a duration that can't be parsed is rejected."""
+    for duration in ["1e400", "999999999999h"]:
+        with pytest.raises(InvalidUsage):
+            asyncio.run(wait.process_post({"duration": duration}))